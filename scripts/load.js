@@ -1,10 +1,34 @@
 import http from 'k6/http';
+import exec from 'k6/execution';
 import { sleep } from 'k6';
 
-export const options = {
-  vus: Number(__ENV.USERS || 150),
-  duration: __ENV.DUR || '3m',
-};
+// MAX_USERS switches to sweep mode: a single run ramps 1..MAX_USERS with
+// one stage per VU level, so the adaptive controller pays k6 startup once.
+const maxUsers = Number(__ENV.MAX_USERS || 0);
+
+function sweepStages(target) {
+  const stages = [];
+  for (let i = 1; i <= target; i++) {
+    stages.push({ duration: __ENV.STAGE_DUR || '90s', target: i });
+  }
+  return stages;
+}
+
+export const options = maxUsers > 0
+  ? {
+      scenarios: {
+        sweep: {
+          executor: 'ramping-vus',
+          startVUs: 1,
+          stages: sweepStages(maxUsers),
+          gracefulRampDown: '0s',
+        },
+      },
+    }
+  : {
+      vus: Number(__ENV.USERS || 150),
+      duration: __ENV.DUR || '3m',
+    };
 
 export default function () {
   const url = __ENV.URL;
@@ -21,7 +45,14 @@ export default function () {
 
   const fullUrl = chaos ? `${url}?chaos=${encodeURIComponent(chaos)}` : url;
 
-  http.get(fullUrl, { timeout: '60s' });
+  const params = { timeout: '60s' };
+  if (maxUsers > 0) {
+    // Tag each sample with the active VU level so the controller can
+    // split the single sweep CSV back into per-stage metrics.
+    params.tags = { stage: String(exec.instance.vusActive) };
+  }
+
+  http.get(fullUrl, params);
 
 
   sleep(1);
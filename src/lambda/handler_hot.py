@@ -0,0 +1,104 @@
+"""
+Hot-path helpers for handler.py: chaos parsing and CPU burn.
+
+This module is small, fully annotated and stateless so the deployment
+build can AOT-compile it (`mypyc src/lambda/handler_hot.py`) and bundle
+the resulting .so next to handler.py — the compiled module loads with no
+warmup cost on a Lambda cold start. Importing the plain .py behaves
+identically when the artifact is not compiled.
+"""
+
+import time
+from urllib.parse import unquote
+
+# mypyc-compiled modules load as .so; numba cannot JIT compiled
+# functions (it needs bytecode), so only take the JIT path when running
+# as plain Python.
+_COMPILED = __file__.endswith((".so", ".pyd"))
+
+if not _COMPILED:
+    try:
+        from numba import njit
+    except ImportError:
+        # numba is optional: without it cpu_spin falls back to the pure loop.
+        njit = None  # type: ignore[assignment]
+else:
+    njit = None  # type: ignore[assignment]
+
+# Slot in the (lat_ms, err_pct, cpu_ms) result for each chaos key, so the
+# token loop does one dict lookup instead of an if/elif chain.
+_CHAOS_KEYS = {"lat": 0, "err": 1, "cpu": 2}
+
+
+def _find_chaos(raw_query: str) -> str:
+    """
+    Extract the 'chaos' value from a raw query string without running
+    parse_qs over every parameter on the hot path.
+    """
+    i = 0
+    while True:
+        i = raw_query.find("chaos=", i)
+        if i < 0:
+            return ""
+        if i == 0 or raw_query[i - 1] == "&":
+            break
+        i += 6
+    j = raw_query.find("&", i)
+    return unquote(raw_query[i + 6 : j if j >= 0 else len(raw_query)])
+
+
+def parse_chaos(event: dict) -> "tuple[int, float, int]":
+    """
+    Accept chaos config from:
+      - query: ?chaos=lat:2500,err:0.03,cpu:400
+      - header: X-Chaos: lat:2500,err:0.03,cpu:400
+    """
+    # API Gateway HTTP API
+    chaos_str = _find_chaos(event.get("rawQueryString") or "")
+
+    # Fallback: header
+    if not chaos_str:
+        headers = event.get("headers") or {}
+        chaos_str = headers.get("x-chaos", "")
+
+    vals = [0.0, 0.0, 0.0]
+
+    if chaos_str:
+        for token in chaos_str.split(","):
+            k, _, v = token.partition(":")
+            slot = _CHAOS_KEYS.get(k.strip().lower())
+            v = v.strip()
+            if slot is None or not v:
+                continue
+            vals[slot] = float(v)
+
+    return int(vals[0]), vals[1], int(vals[2])
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _spin_native(n_iters: int) -> int:
+        # LCG step instead of plain summation so LLVM cannot collapse the
+        # loop into a closed form and optimize the burn away.
+        s = 0
+        for _ in range(n_iters):
+            s = (s * 1103515245 + 12345) & 0xFFFFFFFF
+        return s
+else:
+    _spin_native = None  # type: ignore[assignment]
+
+
+def cpu_spin(ms: int) -> None:
+    """Busy-loop CPU for ms milliseconds."""
+    if ms <= 0:
+        return
+    end = time.perf_counter() + (ms / 1000.0)
+    if _spin_native is not None:
+        # Tight native loop between coarse perf_counter checks; the JIT
+        # compile cost is paid once per container (cache=True persists it).
+        while time.perf_counter() < end:
+            _spin_native(1_000_000)
+        return
+    x = 0
+    while time.perf_counter() < end:
+        x += 1  # burn cycles